@@ -5,34 +5,43 @@ A web interface for the AI-powered multi-agent travel planning system
 """
 
 import os
+import atexit
 import asyncio
 import threading
 import time
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify, redirect, url_for, flash
+import uuid
+import hashlib
+import functools
+import statistics
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, current_app, render_template, request, jsonify, redirect, url_for, flash, session, stream_with_context
+from jinja2.utils import htmlsafe_json_dumps
 import logging
 import re
-import io
 import sys
-from contextlib import redirect_stdout, redirect_stderr
 import json # Added for saving/loading test data
+from dataclasses import dataclass
 
-# Load environment variables from .env file if it exists
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv not installed, continue without it
+# Load environment variables from .env file if it exists (set GLOBEPILOT_SKIP_DOTENV=1
+# when the environment is provided by the platform)
+if os.environ.get('GLOBEPILOT_SKIP_DOTENV') != '1':
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass  # dotenv not installed, continue without it
 
-# Import the GlobePiloT system
-from globepilot_enhanced import execute_validated_travel_workflow, extract_user_budget, WorkflowLimits
+SECRET_KEY = os.environ.get('SECRET_KEY', 'globepilot-secret-key-change-in-production')
 
 # Import performance modules
 from cache_manager import cache_manager
-from performance_optimizations import initialize_performance_optimizations
+from job_store import job_store
+from budget import validate_budget_realistic
+from performance_optimizations import initialize_performance_optimizations, cached_page
 
 app = Flask(__name__)
-app.secret_key = os.environ.get('SECRET_KEY', 'globepilot-secret-key-change-in-production')
+app.secret_key = SECRET_KEY
 
 # Initialize all performance optimizations
 app = initialize_performance_optimizations(app)
@@ -40,33 +49,44 @@ app = initialize_performance_optimizations(app)
 # Static file handling is now managed by performance_optimizations.py
 
 # Configure logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
+# Thread and process names aren't in the log format, so don't collect them for every record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
 logger = logging.getLogger(__name__)
 
 # Template functions for performance
+@functools.lru_cache(maxsize=None)
+def _minified_asset(filename):
+    """Minified name of a CSS/JS asset; templates only ask for a handful, so remember them all"""
+    if filename.endswith('.css') and not filename.endswith('.min.css'):
+        return filename.replace('.css', '.min.css')
+    elif filename.endswith('.js') and not filename.endswith('.min.js'):
+        return filename.replace('.js', '.min.js')
+    return filename
+
 @app.template_global()
 def asset_url(filename, version='2.5'):
     """Generate optimized asset URLs with versioning"""
-    from flask import url_for, current_app
-    
     # In production, use minified versions
     if not current_app.debug:
-        if filename.endswith('.css') and not filename.endswith('.min.css'):
-            filename = filename.replace('.css', '.min.css')
-        elif filename.endswith('.js') and not filename.endswith('.min.js'):
-            filename = filename.replace('.js', '.min.js')
+        filename = _minified_asset(filename)
     
     return url_for('static', filename=filename, v=version)
 
+# Resource hints for page heads; fixed, so shared by every render
+PERFORMANCE_HINTS = MappingProxyType({
+    'preload_css': ('css/variables.css',),
+    'preload_js': (),
+    'dns_prefetch': ('fonts.googleapis.com', 'maps.googleapis.com'),
+    'preconnect': ('https://fonts.gstatic.com',)
+})
+
 @app.template_global()
 def performance_hints():
     """Generate performance-related HTML hints"""
-    return {
-        'preload_css': ['css/variables.css'],
-        'preload_js': [],
-        'dns_prefetch': ['fonts.googleapis.com', 'maps.googleapis.com'],
-        'preconnect': ['https://fonts.gstatic.com']
-    }
+    return PERFORMANCE_HINTS
 
 # Component system functions
 @app.template_global()
@@ -76,7 +96,7 @@ def component(name, **kwargs):
         component_path = f'components/{name}.html'
         return render_template(component_path, **kwargs)
     except Exception as e:
-        logger.warning(f"Component '{name}' not found: {e}")
+        logger.warning("Component '%s' not found: %s", name, e)
         return f"<!-- Component '{name}' not found -->"
 
 @app.template_global()
@@ -105,96 +125,16 @@ def component_js_filter(component_name):
     except:
         return ""
 
-# Budget validation data - realistic minimums for different route types
-ROUTE_BUDGET_MINIMUMS = {
-    'domestic_short': 300,      # Same state/region
-    'domestic_medium': 500,     # Cross-country domestic
-    'domestic_long': 700,       # Coast-to-coast
-    'international_nearby': 800, # Canada/Mexico
-    'international_medium': 1200, # Europe/Asia
-    'international_long': 1500,  # Far destinations
-}
-
-def estimate_minimum_budget(origin, destination):
-    """Estimate minimum realistic budget based on origin and destination"""
-    origin_lower = origin.lower()
-    destination_lower = destination.lower()
-    
-    # Major US cities for reference
-    major_us_cities = ['new york', 'los angeles', 'chicago', 'houston', 'phoenix', 
-                      'philadelphia', 'san antonio', 'san diego', 'dallas', 'san jose',
-                      'austin', 'jacksonville', 'san francisco', 'columbus', 'charlotte',
-                      'fort worth', 'indianapolis', 'seattle', 'denver', 'washington dc',
-                      'boston', 'el paso', 'detroit', 'nashville', 'portland', 'memphis',
-                      'oklahoma city', 'las vegas', 'louisville', 'baltimore', 'milwaukee',
-                      'albuquerque', 'tucson', 'fresno', 'sacramento', 'mesa', 'kansas city',
-                      'atlanta', 'long beach', 'colorado springs', 'raleigh', 'omaha',
-                      'miami', 'oakland', 'minneapolis', 'tulsa', 'cleveland', 'wichita',
-                      'arlington', 'new orleans', 'bakersfield', 'tampa', 'honolulu',
-                      'aurora', 'anaheim', 'santa ana', 'st. louis', 'riverside', 'corpus christi',
-                      'lexington', 'pittsburgh', 'anchorage', 'stockton', 'cincinnati',
-                      'saint paul', 'toledo', 'newark', 'greensboro', 'plano', 'henderson',
-                      'lincoln', 'buffalo', 'jersey city', 'chula vista', 'fort wayne',
-                      'orlando', 'st. petersburg', 'chandler', 'laredo', 'norfolk', 'durham',
-                      'madison', 'lubbock', 'irvine', 'winston-salem', 'glendale', 'garland',
-                      'hialeah', 'reno', 'chesapeake', 'gilbert', 'baton rouge', 'irving',
-                      'scottsdale', 'north las vegas', 'fremont', 'boise', 'richmond']
-    
-    # Check if both are US cities
-    origin_is_us = any(city in origin_lower for city in major_us_cities) or any(state in origin_lower for state in ['california', 'texas', 'florida', 'new york', 'pennsylvania', 'illinois', 'ohio', 'georgia', 'north carolina', 'michigan'])
-    dest_is_us = any(city in destination_lower for city in major_us_cities) or any(state in destination_lower for state in ['california', 'texas', 'florida', 'new york', 'pennsylvania', 'illinois', 'ohio', 'georgia', 'north carolina', 'michigan'])
-    
-    if origin_is_us and dest_is_us:
-        # Domestic travel - check distance
-        coast_to_coast_origins = ['california', 'san diego', 'los angeles', 'san francisco', 'seattle', 'portland']
-        coast_to_coast_dests = ['new york', 'boston', 'washington dc', 'philadelphia', 'miami', 'atlanta']
-        
-        is_coast_to_coast = (any(loc in origin_lower for loc in coast_to_coast_origins) and 
-                            any(loc in destination_lower for loc in coast_to_coast_dests)) or \
-                           (any(loc in destination_lower for loc in coast_to_coast_origins) and 
-                            any(loc in origin_lower for loc in coast_to_coast_dests))
-        
-        if is_coast_to_coast:
-            return ROUTE_BUDGET_MINIMUMS['domestic_long']
-        else:
-            return ROUTE_BUDGET_MINIMUMS['domestic_medium']
-    else:
-        # International travel
-        nearby_countries = ['canada', 'mexico', 'canadian', 'mexican']
-        if any(country in origin_lower or country in destination_lower for country in nearby_countries):
-            return ROUTE_BUDGET_MINIMUMS['international_nearby']
-        else:
-            return ROUTE_BUDGET_MINIMUMS['international_medium']
-
-def validate_budget_realistic(origin, destination, min_budget, max_budget):
-    """Validate if the budget is realistic for the given route"""
-    minimum_needed = estimate_minimum_budget(origin, destination)
-    
-    if max_budget < minimum_needed * 0.7:  # 30% tolerance below minimum
-        return False, minimum_needed
-    return True, minimum_needed
-
-# Global variable to store the latest results
-latest_results = {}
-processing_status = {"is_processing": False, "progress": "", "results": None}
+def current_job_id():
+    """Job id of the planning job that belongs to this browser session"""
+    return session.get('job_id')
 
 # ============================================================================
 # ENHANCED PROGRESS TRACKING SYSTEM
 # ============================================================================
 
-# Global tracking variables
-workflow_tracker = {
-    "start_time": None,
-    "current_agent": None,
-    "completed_agents": [],
-    "total_agents": 11,  # Updated to reflect all 11 agents in the workflow
-    "current_agent_index": 0,
-    "api_calls_current_agent": 0,
-    "total_events": 0
-}
-
 # Agent configuration with icons and descriptions
-AGENT_CONFIG = {
+AGENT_CONFIG = MappingProxyType({
     "GeneralResearchAgent": {
         "icon": "fas fa-search",
         "name": "General Research",
@@ -261,252 +201,352 @@ AGENT_CONFIG = {
         "description": "Final quality assurance",
         "index": 10
     }
-}
+})
+
+# The config never changes, so the progress page gets it encoded once instead of in every status
+_AGENT_CONFIG_JSON = htmlsafe_json_dumps(dict(AGENT_CONFIG), dumps=json.dumps)
+
+@app.template_global()
+def agent_config_json():
+    """Agent icons, names and descriptions as a JSON literal for page scripts"""
+    return _AGENT_CONFIG_JSON
+
+# All 11 agents in the workflow
+TOTAL_AGENTS = len(AGENT_CONFIG)
 
-def calculate_progress_percentage():
-    """Calculate overall progress percentage based on agent completion and activity"""
-    if workflow_tracker["total_agents"] == 0:
-        return 0
+def calculate_progress_percentage(job, elapsed_minutes):
+    """Calculate the job's overall progress percentage based on agent completion and activity"""
+    # Every agent done: nothing left to estimate
+    if len(job.completed_agents) >= TOTAL_AGENTS:
+        return 100
     
-    # Base progress on completed agents (each agent = ~14.3%)
-    agent_weight = 100 / workflow_tracker["total_agents"]
-    completed_progress = len(workflow_tracker["completed_agents"]) * agent_weight
+    # Base progress on completed agents (each agent = ~9.1%)
+    agent_weight = 100 / TOTAL_AGENTS
+    completed_progress = len(job.completed_agents) * agent_weight
     
     # Add progress for current agent (estimate based on time and activity)
-    if workflow_tracker["current_agent"]:
+    if job.current_agent:
         # Estimate current agent progress based on time spent
-        if workflow_tracker["start_time"]:
-            elapsed = (time.time() - workflow_tracker["start_time"]) / 60  # minutes
+        if elapsed_minutes is not None:
             # Add some progress for current agent based on time (more realistic)
-            current_agent_progress = min(agent_weight * 0.7, elapsed * 5)  # 5% per minute max
+            current_agent_progress = min(agent_weight * 0.7, elapsed_minutes * 5)  # 5% per minute max
             completed_progress += current_agent_progress
     
     # Use time-based progress if no agents tracked yet
-    if not workflow_tracker["current_agent"] and not workflow_tracker["completed_agents"]:
-        if workflow_tracker["start_time"]:
-            elapsed = (time.time() - workflow_tracker["start_time"]) / 60
+    if not job.current_agent and not job.completed_agents:
+        if elapsed_minutes is not None:
             # Provide steady progress based on time (typical workflow takes 3-5 minutes)
-            time_progress = min(85, elapsed * 20)  # 20% per minute, cap at 85%
+            time_progress = min(85, elapsed_minutes * 20)  # 20% per minute, cap at 85%
             return time_progress
     
     return min(completed_progress, 95)  # Cap at 95% until fully complete
 
-def estimate_time_remaining():
-    """Estimate remaining time based on progress and elapsed time"""
-    if not workflow_tracker["start_time"]:
-        return 2.5
-    
-    elapsed_minutes = (time.time() - workflow_tracker["start_time"]) / 60
-    progress_ratio = calculate_progress_percentage() / 100
-    
-    if progress_ratio > 0.1:  # Only estimate after some progress
-        estimated_total = elapsed_minutes / progress_ratio
-        remaining = max(0, estimated_total - elapsed_minutes)
-        return round(remaining, 1)
-    
-    # Default estimates based on current progress
-    if progress_ratio < 0.2:
-        return 2.0
-    elif progress_ratio < 0.5:
-        return 1.5
-    elif progress_ratio < 0.8:
-        return 1.0
-    else:
-        return 0.5
+# How many of the most recently finished agents the ETA is based on
+RECENT_AGENT_WINDOW = 5
 
-def update_agent_progress(agent_name, event_type="activity"):
-    """Update progress tracking when agent changes or events occur"""
-    global workflow_tracker
-    
-    if agent_name and agent_name != workflow_tracker["current_agent"]:
-        # Agent changed - mark previous as complete
-        if workflow_tracker["current_agent"] and workflow_tracker["current_agent"] not in workflow_tracker["completed_agents"]:
-            workflow_tracker["completed_agents"].append(workflow_tracker["current_agent"])
-        
-        # Set new current agent
-        workflow_tracker["current_agent"] = agent_name
-        workflow_tracker["current_agent_index"] = AGENT_CONFIG.get(agent_name, {}).get("index", 0)
-        workflow_tracker["api_calls_current_agent"] = 0
+# Assumed agent duration until one has finished
+DEFAULT_AGENT_SECONDS = 15
+
+def estimate_time_remaining(job, elapsed_minutes):
+    """Estimate the job's remaining minutes from the median duration of its recently finished agents"""
+    # Checked first: jobs from cached results or test data are finished but have no start time
+    remaining_agents = TOTAL_AGENTS - len(job.completed_agents)
+    if remaining_agents <= 0:
+        return 0.0
     
-    # Track activity for current agent
-    if event_type == "api_call":
-        workflow_tracker["api_calls_current_agent"] += 1
+    if elapsed_minutes is None:
+        return 2.5
     
-    workflow_tracker["total_events"] += 1
-
-def reset_workflow_tracker():
-    """Reset progress tracking for new workflow"""
-    global workflow_tracker
-    workflow_tracker = {
-        "start_time": time.time(),
-        "current_agent": None,
-        "completed_agents": [],
-        "total_agents": 11,  # Updated to reflect all 11 agents in the workflow
-        "current_agent_index": 0,
-        "api_calls_current_agent": 0,
-        "total_events": 0
-    }
+    # Median, so one slow agent doesn't swing the estimate
+    per_agent = statistics.median(job.agent_durations) if job.agent_durations else DEFAULT_AGENT_SECONDS
+    return round(per_agent * remaining_agents / 60, 1)
+
+def _agent_switch_fields(job):
+    """Time the agent that just finished and start timing the next one"""
+    now = time.monotonic()
+    durations = job.agent_durations
+    if job.agent_started_at is not None:
+        durations = (*durations, now - job.agent_started_at)[-RECENT_AGENT_WINDOW:]
+    return {"agent_started_at": now, "agent_durations": durations}
 
-def workflow_progress_callback(event_type, data):
-    """Callback function to receive real-time progress updates from the workflow"""
-    global workflow_tracker
+def workflow_progress_callback(job_id, event_type, data):
+    """Receive real-time progress updates from the workflow of one job
     
+    Bind the job with functools.partial before handing it to the workflow.
+    """
     if event_type in ["agent_change", "workflow_start"]:
-        # Update tracker with real agent data from workflow
-        workflow_tracker["current_agent"] = data["current_agent"]
-        workflow_tracker["completed_agents"] = data["completed_agents"].copy()
-        workflow_tracker["api_calls_current_agent"] = data["api_calls"]
-        workflow_tracker["total_events"] = data["event_count"]
+        job = job_store.get(job_id)
+        if job is None:
+            return
+        
+        fields = {
+            "current_agent": data["current_agent"],
+            # An immutable snapshot from the workflow, so it can be kept without copying
+            "completed_agents": data["completed_agents"],
+            "total_events": data["event_count"]
+        }
+        if data["current_agent"] != job.current_agent:
+            fields.update(_agent_switch_fields(job))
+        job_store.update(job_id, **fields)
         
         event_label = "started" if event_type == "workflow_start" else "active"
         print(f"📊 Flask Progress Update: {data['current_agent']} {event_label}, {len(data['completed_agents'])} completed")
 
-class ProgressCapturingLogger:
-    """Captures workflow log output to track agent progress"""
-    def __init__(self, workflow_tracker_ref):
-        self.workflow_tracker = workflow_tracker_ref
-        self.buffer = io.StringIO()
-        self.original_stdout = sys.stdout
-        
-    def write(self, text):
-        # Write to original stdout
-        self.original_stdout.write(text)
-        self.original_stdout.flush()
-        
-        # Check for agent activation messages
-        if "🤖" in text and "is now active" in text:
-            self.parse_agent_activation(text)
-        
-        return len(text)
-    
-    def flush(self):
-        self.original_stdout.flush()
-    
-    def parse_agent_activation(self, log_line):
-        """Parse agent activation from log line like: 🤖 AccommodationsAgent is now active (event: 808, API calls: 18)"""
-        import re
-        
-        # Extract agent name and details
-        pattern = r'🤖 (\w+) is now active \(event: (\d+), API calls: (\d+)\)'
-        match = re.search(pattern, log_line)
-        
-        if match:
-            agent_name = match.group(1)
-            event_count = int(match.group(2))
-            api_calls = int(match.group(3))
-            
-            # Update workflow tracker
-            if agent_name not in self.workflow_tracker["completed_agents"]:
-                # Mark previous agent as complete if exists
-                if self.workflow_tracker["current_agent"]:
-                    prev_agent = self.workflow_tracker["current_agent"]
-                    if prev_agent not in self.workflow_tracker["completed_agents"]:
-                        self.workflow_tracker["completed_agents"].append(prev_agent)
-                
-                # Set new current agent
-                self.workflow_tracker["current_agent"] = agent_name
-                self.workflow_tracker["api_calls_current_agent"] = api_calls
-                self.workflow_tracker["total_events"] = event_count
-                
-                print(f"📊 Flask Progress Update: {agent_name} active, {len(self.workflow_tracker['completed_agents'])} completed")
-
-def get_enhanced_status():
-    """Get enhanced status information for frontend"""
-    progress_percentage = calculate_progress_percentage()
-    time_remaining = estimate_time_remaining()
+def get_enhanced_status(job):
+    """Get enhanced status information about the job for the frontend"""
+    # One clock read per status; monotonic so wall-clock adjustments don't skew the ETA
+    elapsed_minutes = (time.monotonic() - job.started_at) / 60 if job.started_at else None
+    progress_percentage = calculate_progress_percentage(job, elapsed_minutes)
+    time_remaining = estimate_time_remaining(job, elapsed_minutes)
     
     current_agent_info = None
-    if workflow_tracker["current_agent"]:
-        current_agent_info = AGENT_CONFIG.get(workflow_tracker["current_agent"], {})
+    if job.current_agent:
+        current_agent_info = AGENT_CONFIG.get(job.current_agent, {})
     
     return {
         "progress_percentage": progress_percentage,
         "time_remaining_minutes": time_remaining,
-        "current_agent": workflow_tracker["current_agent"],
         "current_agent_info": current_agent_info,
-        "completed_agents": workflow_tracker["completed_agents"],
-        "total_agents": workflow_tracker["total_agents"],
-        "agent_config": AGENT_CONFIG,
-        "total_events": workflow_tracker["total_events"],
-        "elapsed_minutes": (time.time() - workflow_tracker["start_time"]) / 60 if workflow_tracker["start_time"] else 0
+        "total_agents": TOTAL_AGENTS,
+        "elapsed_minutes": elapsed_minutes or 0
     }
 
-def run_async_workflow(prompt, result_storage):
-    """Run the async workflow in a separate thread with enhanced progress tracking"""
-    try:
-        loop = asyncio.new_event_loop()
+# ============================================================================
+# BACKGROUND WORKFLOW EXECUTION
+# ============================================================================
+
+def _lazy_workflow():
+    """Import the GlobePiloT system on first use; only planning routes need the LLM stack"""
+    import globepilot_enhanced
+    return globepilot_enhanced
+
+# Production limits for full workflow execution (WorkflowLimits fields)
+PRODUCTION_LIMITS = dict(
+    max_iterations=100,  # Increased to allow for web searches
+    max_revision_cycles=2,  # Increased to allow for location-specific revisions
+    max_api_calls=500,  # Increased significantly to allow for address research
+    max_duration_minutes=20,  # Increased timeout for enhanced location research
+    early_termination_enabled=True
+)
+
+# Lighter limits for revision requests
+REVISION_LIMITS = dict(
+    max_iterations=40,
+    max_revision_cycles=1,
+    max_api_calls=80,
+    max_duration_minutes=5,
+    early_termination_enabled=True
+)
+
+# Upper bound on workflows that are running or waiting to run
+MAX_QUEUED_WORKFLOWS = int(os.environ.get('MAX_QUEUED_WORKFLOWS', 32))
+
+# Workflows allowed to call the LLM/search APIs at the same time; the rest wait their turn
+MAX_CONCURRENT_PLANS = int(os.environ.get('MAX_CONCURRENT_PLANS', 4))
+
+# Threads for blocking calls made from the loop (DNS lookups, result caching)
+WORKFLOW_IO_THREADS = int(os.environ.get('WORKFLOW_IO_THREADS', 8))
+
+class WorkflowQueueFull(RuntimeError):
+    """Raised when no more workflows can be accepted"""
+
+def _start_workflow_loop():
+    """Start the long-lived event loop that runs every planning workflow"""
+    loop = asyncio.new_event_loop()
+    loop.set_default_executor(
+        ThreadPoolExecutor(max_workers=WORKFLOW_IO_THREADS, thread_name_prefix="globepilot-io")
+    )
+    
+    def run():
         asyncio.set_event_loop(loop)
-        
-        # Initialize progress tracking
-        reset_workflow_tracker()
-        
-        # Set up real-time progress callback
-        
-        result_storage["is_processing"] = True
-        result_storage["progress"] = "Starting GlobePiloT workflow..."
-        
-        # Redirect stdout to capture agent activation messages
-        sys.stdout = ProgressCapturingLogger(workflow_tracker)
-        sys.stderr = ProgressCapturingLogger(workflow_tracker) # Also capture stderr for errors
-        
-        # Production limits for full workflow execution
-        production_limits = WorkflowLimits(
-            max_iterations=100,  # Increased to allow for web searches
-            max_revision_cycles=2,  # Increased to allow for location-specific revisions
-            max_api_calls=500,  # Increased significantly to allow for address research
-            max_duration_minutes=20,  # Increased timeout for enhanced location research
-            early_termination_enabled=True
-        )
-        
-        # Run the workflow with real-time progress tracking via log monitoring and proper cleanup
-        original_stdout = sys.stdout
-        original_stderr = sys.stderr
-        
+        loop.run_forever()
+    
+    thread = threading.Thread(target=run, name="globepilot-workflows", daemon=True)
+    thread.start()
+    return loop
+
+workflow_loop = _start_workflow_loop()
+_workflow_slots = threading.BoundedSemaphore(MAX_QUEUED_WORKFLOWS)
+_running_workflows = asyncio.Semaphore(MAX_CONCURRENT_PLANS)
+
+# Running plan jobs keyed by their request's cache key, so identical plans share one workflow
+_inflight_plans = {}
+_inflight_lock = threading.Lock()
+
+@dataclass(slots=True)
+class RunningWorkflow:
+    """Handle on a scheduled workflow, kept so abandoned plans can be cancelled"""
+    future: object
+    plan_key: str = None
+    sessions: int = 1
+
+# Scheduled workflows by job id (guarded by _inflight_lock)
+_running_workflows_by_job = {}
+
+@atexit.register
+def _shutdown_workflow_loop():
+    """Close pooled HTTP connections and the loop's default executor, then stop the loop"""
+    cleanups = [workflow_loop.shutdown_default_executor()]
+    
+    # The workflow module (and its HTTP clients) only exists if a plan was requested
+    workflow = sys.modules.get('globepilot_enhanced')
+    if workflow is not None:
+        cleanups.insert(0, workflow.close_http_clients())
+    
+    for cleanup in cleanups:
         try:
-            result = loop.run_until_complete(execute_validated_travel_workflow(prompt, custom_limits=production_limits))
-        except Exception as workflow_error:
-            logger.error(f"Workflow execution error: {workflow_error}")
-            result = None
-        finally:
-            # Restore original stdout/stderr
-            sys.stdout = original_stdout
-            sys.stderr = original_stderr
-            
-            # Clean up any pending tasks
-            try:
-                pending_tasks = [task for task in asyncio.all_tasks(loop) if not task.done()]
-                if pending_tasks:
-                    logger.info(f"Cleaning up {len(pending_tasks)} pending tasks")
-                    for task in pending_tasks:
-                        task.cancel()
-                    # Wait for tasks to complete cancellation
-                    loop.run_until_complete(asyncio.gather(*pending_tasks, return_exceptions=True))
-            except Exception as cleanup_error:
-                logger.warning(f"Task cleanup warning: {cleanup_error}")
-        
-        # Mark all agents as complete when workflow finishes
-        workflow_tracker["completed_agents"] = list(AGENT_CONFIG.keys())
-        workflow_tracker["current_agent"] = None
-        
-        result_storage["results"] = result
-        result_storage["is_processing"] = False
-        result_storage["progress"] = "Complete"
-        
-        # Cache the results if successful
-        if result and result_storage.get("original_request"):
-            try:
-                cache_manager.cache_travel_results(result_storage["original_request"], result)
-                logger.info("✅ Travel results cached successfully")
-            except Exception as cache_error:
-                logger.warning(f"Failed to cache results: {cache_error}")
-        
-        loop.close()
-        
+            asyncio.run_coroutine_threadsafe(cleanup, workflow_loop).result(timeout=5)
+        except Exception as e:
+            logger.warning("Workflow loop shutdown warning: %s", e)
+    
+    workflow_loop.call_soon_threadsafe(workflow_loop.stop)
+
+def submit_workflow(coro):
+    """Schedule a workflow coroutine on the shared loop, refusing work when the queue is full"""
+    if not _workflow_slots.acquire(blocking=False):
+        coro.close()
+        raise WorkflowQueueFull("Too many travel plans in progress, please try again shortly.")
+    
+    future = asyncio.run_coroutine_threadsafe(coro, workflow_loop)
+    future.add_done_callback(lambda _: _workflow_slots.release())
+    return future
+
+def _release_inflight_plan(plan_key, job_id):
+    """Stop sharing a plan job with new identical requests"""
+    with _inflight_lock:
+        if plan_key is not None and _inflight_plans.get(plan_key) == job_id:
+            del _inflight_plans[plan_key]
+
+async def _submit_workflow(workflow, prompt, job_id, limits, done_message, request_params=None, plan_key=None):
+    """Run one planning workflow and store its outcome on the job"""
+    queued = _running_workflows.locked()
+    if queued:
+        job_store.update(job_id, progress="Waiting for a free planner...")
+    
+    try:
+        async with _running_workflows:
+            if queued:
+                job_store.update(job_id, progress="Starting GlobePiloT workflow...")
+            result = await workflow.execute_validated_travel_workflow(
+                prompt, custom_limits=workflow.WorkflowLimits(**limits),
+                progress_callback=functools.partial(workflow_progress_callback, job_id)
+            )
+    except asyncio.CancelledError:
+        job_store.update(job_id, is_processing=False, progress="Cancelled")
+        raise
     except Exception as e:
-        logger.error(f"Workflow error: {e}")
-        result_storage["is_processing"] = False
-        result_storage["progress"] = f"Error: {str(e)}"
-        result_storage["results"] = None
+        logger.error("Workflow error: %s", e)
+        job_store.update(job_id, is_processing=False, progress=f"Error: {str(e)}", results=None)
+        return
+    finally:
+        _release_inflight_plan(plan_key, job_id)
+    
+    # Mark all agents as complete when workflow finishes
+    job_store.update(
+        job_id, results=result, is_processing=False, progress=done_message,
+        current_agent=None, completed_agents=tuple(AGENT_CONFIG)
+    )
+    
+    # Cache the results under the form parameters plan_travel looks them up by
+    # (file I/O, so keep it off the loop)
+    if result and request_params:
+        try:
+            await asyncio.to_thread(cache_manager.cache_travel_results, request_params, result)
+            logger.info("✅ Travel results cached successfully")
+        except Exception as cache_error:
+            logger.warning("Failed to cache results: %s", cache_error)
+
+def launch_workflow(prompt, limits, original_request, progress, done_message, request_params=None):
+    """Create a job for this session and schedule its workflow on the background loop
+    
+    With request_params, a matching plan that is still running is joined instead of
+    starting a second identical workflow, and the results are cached under them.
+    """
+    workflow = _lazy_workflow()
+    plan_key = cache_manager.travel_results_key(request_params) if request_params else None
+    
+    with _inflight_lock:
+        job_id = _inflight_plans.get(plan_key)
+        running = _running_workflows_by_job.get(job_id)
+        joined = running is not None
+        if joined:
+            running.sessions += 1
+        else:
+            job_id = uuid.uuid4().hex
+            job_store.create(
+                job_id, is_processing=True, progress=progress, original_request=original_request,
+                started_at=time.monotonic()
+            )
+            if plan_key is not None:
+                _inflight_plans[plan_key] = job_id
+            # Registered with the job so identical requests join it before the workflow is submitted
+            running = RunningWorkflow(None, plan_key)
+            _running_workflows_by_job[job_id] = running
+    
+    session['job_id'] = job_id
+    if joined:
+        logger.info("Joining running plan job %s", job_id)
+        return job_id
+    
+    try:
+        future = submit_workflow(_submit_workflow(workflow, prompt, job_id, limits, done_message, request_params, plan_key))
+    except WorkflowQueueFull as e:
+        _forget_running_workflow(job_id)
+        _release_inflight_plan(plan_key, job_id)
+        job_store.update(job_id, is_processing=False, progress=f"Error: {str(e)}")
+        raise
+    
+    with _inflight_lock:
+        # cancel_workflow may have dropped the handle while the workflow was being submitted
+        cancelled = _running_workflows_by_job.get(job_id) is not running
+        if not cancelled:
+            if future.done():
+                # Already finished, so there is nothing left to cancel
+                del _running_workflows_by_job[job_id]
+            else:
+                running.future = future
+    
+    if cancelled:
+        future.cancel()
+    elif running.future is not None:
+        future.add_done_callback(lambda _: _forget_running_workflow(job_id))
+    
+    return job_id
+
+def _forget_running_workflow(job_id):
+    """Drop a finished workflow's handle"""
+    with _inflight_lock:
+        _running_workflows_by_job.pop(job_id, None)
+
+def cancel_workflow(job_id):
+    """Cancel a job's workflow once no other session is waiting on it; True if cancelled"""
+    with _inflight_lock:
+        running = _running_workflows_by_job.get(job_id)
+        if running is None:
+            return False
+        running.sessions -= 1
+        if running.sessions > 0:
+            return False
+        del _running_workflows_by_job[job_id]
+    
+    # A workflow cancelled before it started never reaches its own cleanup
+    _release_inflight_plan(running.plan_key, job_id)
+    # Without a future the workflow is still being submitted; launch_workflow cancels it
+    if running.future is not None:
+        running.future.cancel()
+    job_store.update(job_id, is_processing=False, progress="Cancelled")
+    logger.info("Cancelled plan job %s", job_id)
+    return True
+
+# Budget breakdown section headings, most decorated first; one scan finds the first heading
+_BUDGET_SECTION_RE = re.compile(
+    r'(?:\*\*💰 BUDGET BREAKDOWN:\*\*|\*\*BUDGET BREAKDOWN:\*\*|💰 BUDGET BREAKDOWN:|BUDGET BREAKDOWN:)'
+    r'(.*?)(?=\*\*|\n\n|$)',
+    re.DOTALL | re.IGNORECASE
+)
+
+# Cost ranges mentioned anywhere in an itinerary
+_COST_RE = re.compile(r'(?:Total|Budget|Cost):?\s*\$[\d,]+-[\d,]+', re.IGNORECASE)
 
 def extract_budget_from_itinerary(itinerary_text):
     """Extract budget breakdown from itinerary text when dedicated budget analysis is not available"""
@@ -514,53 +554,75 @@ def extract_budget_from_itinerary(itinerary_text):
         return "Budget analysis not available"
     
     # Look for budget breakdown section in the itinerary
-    budget_patterns = [
-        r'\*\*💰 BUDGET BREAKDOWN:\*\*(.*?)(?=\*\*|\n\n|$)',
-        r'\*\*BUDGET BREAKDOWN:\*\*(.*?)(?=\*\*|\n\n|$)',
-        r'💰 BUDGET BREAKDOWN:(.*?)(?=\*\*|\n\n|$)',
-        r'BUDGET BREAKDOWN:(.*?)(?=\*\*|\n\n|$)'
-    ]
-    
-    budget_info = None
-    for pattern in budget_patterns:
-        match = re.search(pattern, itinerary_text, re.DOTALL | re.IGNORECASE)
-        if match:
-            budget_info = match.group(1).strip()
-            break
+    match = _BUDGET_SECTION_RE.search(itinerary_text)
+    budget_info = match.group(1).strip() if match else None
     
     if budget_info:
         # Clean up and format the budget information
-        lines = budget_info.split('\n')
-        formatted_budget = "**Budget Analysis (from Itinerary):**\n\n"
+        parts = ["**Budget Analysis (from Itinerary):**", ""]
         
-        for line in lines:
+        for line in budget_info.splitlines():
             line = line.strip()
             if line and not line.startswith('*'):
                 # Clean up bullet points and formatting
                 if line.startswith('•'):
                     line = line[1:].strip()
-                formatted_budget += f"• {line}\n"
+                parts.append(f"• {line}")
         
-        return formatted_budget
+        parts.append("")
+        return "\n".join(parts)
     
     # Fallback: Look for any cost/budget information
-    cost_patterns = [
-        r'Total:?\s*\$[\d,]+-[\d,]+',
-        r'Budget:?\s*\$[\d,]+-[\d,]+',
-        r'Cost:?\s*\$[\d,]+-[\d,]+'
-    ]
-    
-    costs_found = []
-    for pattern in cost_patterns:
-        matches = re.findall(pattern, itinerary_text, re.IGNORECASE)
-        costs_found.extend(matches)
+    costs_found = _COST_RE.findall(itinerary_text)
     
     if costs_found:
         return f"**Budget Summary:**\n\n" + '\n'.join([f"• {cost}" for cost in costs_found])
     
     return "Budget analysis not available - please check the detailed research notes for cost information"
 
+# Planning form fields and their defaults, in the order plan_travel unpacks them
+PLAN_FORM_FIELDS = (
+    ('origin', ''),
+    ('destination', ''),
+    ('departure_date', ''),
+    ('return_date', ''),
+    ('budget_min', ''),
+    ('budget_max', ''),
+    ('travelers', '1'),
+    ('trip_type', 'leisure'),
+    ('special_requirements', '')
+)
+
+# Workflow prompts, filled in per request with a single str.format call
+PLAN_PROMPT_TEMPLATE = """Plan a comprehensive travel experience:
+
+Starting Location: {origin}
+Destination: {destination}
+Travel Dates: Departure: {departure_date}, Return: {return_date}
+Budget: ${budget_min} - ${budget_max}
+Number of Travelers: {travelers}
+Travel Type: {trip_type}
+
+Special Requirements: {special_requirements}
+
+Please provide a detailed travel plan including accommodation, transportation, activities, and budget breakdown.
+"""
+
+REVISION_PROMPT_TEMPLATE = """Create a revised travel plan:
+
+Origin: {origin}
+Destination: {destination}
+Travel Dates: {travel_dates}
+Budget Range: {budget_range}
+Number of Travelers: {travelers}
+Trip Type: {trip_type}
+Special Requirements: {special_requirements}
+
+This is a REVISION - please address the previous budget concerns and requirements.
+"""
+
 @app.route('/')
+@cached_page(timeout=3600)
 def index():
     """Main travel planning form"""
     return render_template('index.html')
@@ -568,68 +630,48 @@ def index():
 @app.route('/plan', methods=['POST'])
 def plan_travel():
     """Process travel planning request with intelligent caching"""
-    global processing_status
-    
     try:
-        # Get form data
-        origin = request.form.get('origin', '').strip()
-        destination = request.form.get('destination', '').strip()
-        departure_date = request.form.get('departure_date', '').strip()
-        return_date = request.form.get('return_date', '').strip()
-        budget_min = request.form.get('budget_min', '').strip()
-        budget_max = request.form.get('budget_max', '').strip()
-        travelers = request.form.get('travelers', '1').strip()
-        trip_type = request.form.get('trip_type', 'leisure').strip()
-        special_requirements = request.form.get('special_requirements', '').strip()
-        
-        # Create request parameters for caching
-        request_params = {
-            'origin': origin,
-            'destination': destination,
-            'departure_date': departure_date,
-            'return_date': return_date,
-            'budget_min': budget_min,
-            'budget_max': budget_max,
-            'travelers': travelers,
-            'trip_type': trip_type,
-            'special_requirements': special_requirements
-        }
+        # Get form data in one pass; also serves as the request parameters for caching
+        form = request.form
+        request_params = {field: form.get(field, default).strip() for field, default in PLAN_FORM_FIELDS}
+        (origin, destination, departure_date, return_date, budget_min, budget_max,
+         travelers, trip_type, special_requirements) = request_params.values()
         
         # Check for cached results first (speeds up repeated requests)
         cached_results = cache_manager.get_cached_travel_results(request_params)
         if cached_results and not request.form.get('force_refresh'):
-            logger.info(f"🚀 Serving cached travel results for {origin} → {destination}")
+            logger.info("🚀 Serving cached travel results for %s → %s", origin, destination)
             
-            processing_status = {
-                "is_processing": False,
-                "progress": "Complete (from cache)",
-                "results": cached_results,
-                "original_request": request_params
-            }
+            job_id = uuid.uuid4().hex
+            job_store.create(
+                job_id,
+                progress="Complete (from cache)",
+                results=cached_results,
+                original_request=request_params,
+                completed_agents=tuple(AGENT_CONFIG)
+            )
+            session['job_id'] = job_id
             
-                    # Redirect to index (results page will be rebuilt)
-        return redirect(url_for('index'))
+            # Redirect to index (results page will be rebuilt)
+            return redirect(url_for('index'))
         
         # Validate required fields
-        if not all([origin, destination, departure_date, return_date, budget_min, budget_max]):
+        if not (origin and destination and departure_date and return_date and budget_min and budget_max):
             flash('Please fill in all required fields.', 'error')
             return redirect(url_for('index'))
         
-        # Convert budget to numbers for validation
-        try:
-            min_budget_num = float(budget_min)
-            max_budget_num = float(budget_max)
-            
-            # DEBUG: Log received budget values
-            logger.info(f"📊 BUDGET DEBUG - Form inputs received:")
-            logger.info(f"   • budget_min (raw): '{budget_min}' -> parsed: {min_budget_num}")
-            logger.info(f"   • budget_max (raw): '{budget_max}' -> parsed: {max_budget_num}")
-            logger.info(f"   • Final range: ${min_budget_num} - ${max_budget_num}")
-            
-        except ValueError:
+        # Convert budget to numbers for validation (None when not a number)
+        min_budget_num = form.get('budget_min', type=float)
+        max_budget_num = form.get('budget_max', type=float)
+        if min_budget_num is None or max_budget_num is None:
             flash('Please enter valid budget amounts.', 'error')
             return redirect(url_for('index'))
         
+        # DEBUG: Log received budget values
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📊 BUDGET DEBUG - budget_min (raw): '%s' -> parsed: %s, budget_max (raw): '%s' -> parsed: %s",
+                         budget_min, min_budget_num, budget_max, max_budget_num)
+        
         # Validate budget range
         if min_budget_num >= max_budget_num:
             flash('Maximum budget must be greater than minimum budget.', 'error')
@@ -652,34 +694,20 @@ def plan_travel():
                                  special_requirements=special_requirements)
         
         # Create the travel prompt
-        prompt = f"""
-        Plan a comprehensive travel experience:
-        
-        Starting Location: {origin}
-        Destination: {destination}
-        Travel Dates: Departure: {departure_date}, Return: {return_date}
-        Budget: ${budget_min} - ${budget_max}
-        Number of Travelers: {travelers}
-        Travel Type: {trip_type}
-        
-        Special Requirements: {special_requirements if special_requirements else 'None'}
-        
-        Please provide a detailed travel plan including accommodation, transportation, activities, and budget breakdown.
-        """
+        prompt = PLAN_PROMPT_TEMPLATE.format_map(
+            dict(request_params, special_requirements=special_requirements or 'None')
+        )
         
-        # DEBUG: Log the complete prompt being sent
-        logger.info(f"🔍 PROMPT DEBUG - Complete prompt being sent to workflow:")
-        logger.info(f"   • Prompt contains budget: 'Budget: ${budget_min} - ${budget_max}'")
-        logger.info(f"   • Full prompt length: {len(prompt)} characters")
-        logger.info(f"   • Prompt preview: {prompt[:200]}...")
+        # DEBUG: Log the prompt being sent
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🔍 PROMPT DEBUG - budget: $%s - $%s, length: %d characters, preview: %s...",
+                         budget_min, budget_max, len(prompt), prompt[:200])
         
-        # Reset processing status and progress tracking
-        reset_workflow_tracker()
-        processing_status = {
-            "is_processing": True, 
-            "progress": "Initializing...", 
-            "results": None,
-            "original_request": {
+        # Start the workflow on the background loop
+        job_id = launch_workflow(
+            prompt,
+            PRODUCTION_LIMITS,
+            original_request={
                 "origin": origin,
                 "destination": destination,
                 "travel_dates": f"Departure: {departure_date}, Return: {return_date}",
@@ -687,127 +715,184 @@ def plan_travel():
                 "travelers": travelers,
                 "trip_type": trip_type,
                 "special_requirements": special_requirements
-            }
-        }
-        
-        # Start the workflow in a background thread
-        thread = threading.Thread(
-            target=run_async_workflow, 
-            args=(prompt, processing_status)
+            },
+            progress="Starting GlobePiloT workflow...",
+            done_message="Complete",
+            request_params=request_params
         )
-        thread.daemon = True
-        thread.start()
         
         # Store request details for the results page
         request_details = request_params.copy()
         request_details.update({
             "budget_range": f"${budget_min} - ${budget_max}",
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "timestamp_ms": int(time.time() * 1000)
         })
         
-        return render_template('processing.html', request_details=request_details)
+        return render_template('processing.html', request_details=request_details, job_id=job_id)
         
     except Exception as e:
-        logger.error(f"Planning error: {e}")
+        logger.error("Planning error: %s", e)
         flash(f'Error processing request: {str(e)}', 'error')
         return redirect(url_for('index'))
 
-@app.route('/status')
-def get_status():
+def build_status(job):
+    """Combine a job's basic status with enhanced progress tracking"""
+    return {
+        **job.to_dict(),           # Include original status fields
+        **get_enhanced_status(job) # Add enhanced progress tracking
+    }
+
+@app.route('/status', defaults={'job_id': None})
+@app.route('/status/<job_id>')
+def get_status(job_id):
     """API endpoint to check processing status with enhanced progress tracking"""
-    # Combine basic status with enhanced progress tracking
-    enhanced_status = get_enhanced_status()
+    job, version = job_store.get_versioned(job_id or current_job_id())
+    if job is None:
+        return jsonify({"error": "Unknown job"}), 404
     
-    status_response = {
-        **processing_status,  # Include original status fields
-        **enhanced_status     # Add enhanced progress tracking
-    }
+    status = build_status(job)
+    
+    # Unchanged job and agent progress since the client's last poll: skip the body
+    etag_key = (
+        version,
+        status["current_agent"],
+        len(status["completed_agents"]),
+        int(status["progress_percentage"])
+    )
+    etag = hashlib.blake2b(repr(etag_key).encode(), digest_size=8).hexdigest()
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(status)
+    
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+# How often the status stream re-checks agent progress between job updates
+STATUS_STREAM_INTERVAL = 2
+
+@app.route('/status/stream/<job_id>')
+def stream_status(job_id):
+    """Server-Sent Events stream of a job's progress, sent only when it changes, with keepalives between"""
+    def events():
+        version = None
+        last_key = None
+        
+        while True:
+            job, version = job_store.wait_for_change(job_id, version, timeout=STATUS_STREAM_INTERVAL)
+            if job is None:
+                yield 'event: error\ndata: {"error": "Unknown job"}\n\n'
+                return
+            
+            status = build_status(job)
+            # The full results can be large; the page only needs to know they exist
+            status["results"] = bool(status["results"])
+            
+            change_key = (
+                status["progress"],
+                status["is_processing"],
+                status["current_agent"],
+                len(status["completed_agents"]),
+                int(status["progress_percentage"])
+            )
+            if change_key != last_key:
+                last_key = change_key
+                yield f"data: {app.json.dumps(status)}\n\n"
+            else:
+                # Nothing new this interval: a comment line keeps proxies from closing the idle stream
+                yield ": keepalive\n\n"
+            
+            if not status["is_processing"]:
+                return
     
-    return jsonify(status_response)
+    response = Response(stream_with_context(events()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/cancel', methods=['POST'])
+def cancel_plan():
+    """Abandon the session's plan, stopping its workflow if nobody else is waiting on it"""
+    job_id = session.pop('job_id', None)
+    if job_id:
+        cancel_workflow(job_id)
+    return redirect(url_for('index'))
 
 # Results route removed - will be rebuilt from scratch
 
+# Matches an existing "Budget: ..." sentence in special requirements
+_BUDGET_RE = re.compile(r'Budget:[^.]*')
+
 @app.route('/request_revision', methods=['POST'])
 def request_revision():
     """Handle revision requests from users"""
-    global processing_status
-    
     try:
         # Get form data
         min_budget = request.form.get('min_budget')
         max_budget = request.form.get('max_budget')
         revision_notes = request.form.get('revision_notes', '')
         
-        # Get original request details from session or processing status
-        if not processing_status.get("original_request"):
+        # Get original request details from the session's job
+        job = job_store.get(current_job_id())
+        if not job or not job.original_request:
             flash('Original request not found. Please start a new travel plan.', 'error')
             return redirect(url_for('index'))
         
-        original_request = processing_status["original_request"]
+        original_request = job.original_request
         
         # Update budget if provided
         budget_text = original_request.get("special_requirements", "")
         if min_budget and max_budget:
-            # Update budget in the request
-            import re
+            # Replace an existing budget in the requirements, or put the new one first
             budget_range = f"Budget: ${min_budget} - ${max_budget}"
-            if "Budget:" in budget_text:
-                # Replace existing budget
-                budget_text = re.sub(r'Budget:[^\.]*', budget_range, budget_text)
-            else:
-                # Add new budget
-                budget_text = f"{budget_range}. {budget_text}" if budget_text else budget_range
+            budget_text, replaced = _BUDGET_RE.subn(budget_range, budget_text)
+            if not replaced:
+                budget_text = ". ".join(filter(None, (budget_range, budget_text)))
         
         # Add revision notes
         if revision_notes:
-            budget_text = f"{budget_text}\n\nRevision Notes: {revision_notes}" if budget_text else f"Revision Notes: {revision_notes}"
-        
-        # Update the original request
-        updated_request = original_request.copy()
-        updated_request["special_requirements"] = budget_text
+            budget_text = "\n\n".join(filter(None, (budget_text, f"Revision Notes: {revision_notes}")))
         
-        # Reset processing status and start new planning
-        processing_status = {
-            "is_processing": False,
-            "progress": "Ready to start revision...",
-            "results": None,
-            "original_request": updated_request
-        }
-        
-        # Redirect to processing with updated request
+        # Start new planning straight away with the updated request
         flash('Revision requested! Starting new planning with updated requirements.', 'info')
-        return redirect(url_for('plan_trip_revised', **updated_request))
+        return start_revised_planning({**original_request, "special_requirements": budget_text})
         
     except Exception as e:
-        logger.error(f"Revision request error: {e}")
+        logger.error("Revision request error: %s", e)
         flash(f'Error processing revision request: {str(e)}', 'error')
         return redirect(url_for('index'))
 
-@app.route('/plan_trip_revised')
-def plan_trip_revised():
-    """Handle revised trip planning with updated parameters"""
-    global processing_status
-    
+def start_revised_planning(updated_request):
+    """Launch revised planning for an updated request and show the processing page"""
     try:
-        # Get parameters from URL
-        origin = request.args.get('origin', '')
-        destination = request.args.get('destination', '')
-        travel_dates = request.args.get('travel_dates', '')
-        budget_range = request.args.get('budget_range', '')
-        travelers = request.args.get('travelers', '2')
-        trip_type = request.args.get('trip_type', 'leisure')
-        special_requirements = request.args.get('special_requirements', '')
-        
-        if not all([origin, destination, travel_dates]):
+        origin = updated_request.get('origin', '')
+        destination = updated_request.get('destination', '')
+        travel_dates = updated_request.get('travel_dates', '')
+        budget_range = updated_request.get('budget_range', '')
+        travelers = updated_request.get('travelers', '2')
+        trip_type = updated_request.get('trip_type', 'leisure')
+        special_requirements = updated_request.get('special_requirements', '')
+        
+        if not (origin and destination and travel_dates):
             flash('Missing required information for revision. Please start a new trip.', 'error')
             return redirect(url_for('index'))
         
-        # Start planning process (similar to plan_trip)
-        processing_status = {
-            "is_processing": True,
-            "progress": "Starting revised planning...",
-            "results": None,
-            "original_request": {
+        prompt = REVISION_PROMPT_TEMPLATE.format(
+            origin=origin,
+            destination=destination,
+            travel_dates=travel_dates,
+            budget_range=budget_range,
+            travelers=travelers,
+            trip_type=trip_type,
+            special_requirements=special_requirements
+        )
+        
+        # Start planning process (similar to plan_trip) with revision limits
+        job_id = launch_workflow(
+            prompt,
+            REVISION_LIMITS,
+            original_request={
                 "origin": origin,
                 "destination": destination,
                 "travel_dates": travel_dates,
@@ -815,49 +900,10 @@ def plan_trip_revised():
                 "travelers": travelers,
                 "trip_type": trip_type,
                 "special_requirements": special_requirements
-            }
-        }
-        
-        # Run planning asynchronously
-        import threading
-        def run_planning():
-            try:
-                prompt = f"""
-                Create a revised travel plan:
-                
-                Origin: {origin}
-                Destination: {destination}
-                Travel Dates: {travel_dates}
-                Budget Range: {budget_range}
-                Number of Travelers: {travelers}
-                Trip Type: {trip_type}
-                Special Requirements: {special_requirements}
-                
-                This is a REVISION - please address the previous budget concerns and requirements.
-                """
-                
-                # Use production limits for revision requests
-                revision_limits = WorkflowLimits(
-                    max_iterations=40,
-                    max_revision_cycles=1,
-                    max_api_calls=80,
-                    max_duration_minutes=5,
-                    early_termination_enabled=True
-                )
-                result = asyncio.run(execute_validated_travel_workflow(prompt, custom_limits=revision_limits))
-                processing_status["results"] = result
-                processing_status["is_processing"] = False
-                processing_status["progress"] = "Revision complete!"
-                logger.info("Revised travel planning completed successfully")
-                
-            except Exception as e:
-                logger.error(f"Revised planning error: {e}")
-                processing_status["is_processing"] = False
-                processing_status["progress"] = f"Revision failed: {str(e)}"
-        
-        planning_thread = threading.Thread(target=run_planning)
-        planning_thread.daemon = True
-        planning_thread.start()
+            },
+            progress="Starting revised planning...",
+            done_message="Revision complete!"
+        )
         
         # Show processing page for revision
         request_details = {
@@ -868,32 +914,19 @@ def plan_trip_revised():
             "travelers": travelers,
             "trip_type": trip_type,
             "special_requirements": special_requirements,
-            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "timestamp_ms": int(time.time() * 1000),
             "revision": True
         }
         
-        return render_template('processing.html', request_details=request_details)
+        return render_template('processing.html', request_details=request_details, job_id=job_id)
         
     except Exception as e:
-        logger.error(f"Revised planning error: {e}")
+        logger.error("Revised planning error: %s", e)
         flash(f'Error starting revision: {str(e)}', 'error')
         return redirect(url_for('index'))
 
-@app.route('/format_itinerary', methods=['POST'])
-def format_current_itinerary():
-    """Format the current research data into a clean day-by-day itinerary"""
-    global processing_status
-    
-    if not processing_status.get("results"):
-        return jsonify({"error": "No travel data available"}), 400
-    
-    try:
-        # Extract current research data
-        results = processing_status["results"]
-        travel_notes = results.get("travel_notes", {})
-        
-        # Create structured day-by-day itinerary based on NYC research
-        formatted_itinerary = """🗽 NEW YORK CITY ADVENTURE
+# Structured day-by-day itinerary based on NYC research
+FORMATTED_ITINERARY = """🗽 NEW YORK CITY ADVENTURE
 August 20-24, 2025 (4 days, 3 nights)
 
 **Day 1 - Wednesday, August 20** ✈️
@@ -952,22 +985,36 @@ August 20-24, 2025 (4 days, 3 nights)
 • US Open Qualifiers have free grounds access!
 • Friday Coney Island fireworks are spectacular and free"""
 
-        # Update the processing_status with formatted itinerary
-        processing_status["results"]["itinerary"] = formatted_itinerary
+# The success response never changes, so serialize and encode it once
+_FORMATTED_ITINERARY_RESPONSE = app.json.dumps({
+    "status": "success",
+    "message": "Itinerary formatted successfully",
+    "itinerary": FORMATTED_ITINERARY
+}).encode()
+
+@app.route('/format_itinerary', methods=['POST'])
+def format_current_itinerary():
+    """Format the current research data into a clean day-by-day itinerary"""
+    job_id = current_job_id()
+    job = job_store.get(job_id)
+    
+    if not job or not job.results:
+        return jsonify({"error": "No travel data available"}), 400
+    
+    try:
+        # Update the job results with formatted itinerary
+        job_store.update(job_id, results={**job.results, "itinerary": FORMATTED_ITINERARY})
         
         logger.info("✅ Itinerary formatted successfully")
         
-        return jsonify({
-            "status": "success", 
-            "message": "Itinerary formatted successfully",
-            "itinerary": formatted_itinerary
-        })
+        return app.response_class(_FORMATTED_ITINERARY_RESPONSE, mimetype='application/json')
         
     except Exception as e:
-        logger.error(f"❌ Failed to format itinerary: {str(e)}")
+        logger.error("❌ Failed to format itinerary: %s", e)
         return jsonify({"error": f"Failed to format itinerary: {str(e)}"}), 500
 
 @app.route('/about')
+@cached_page(timeout=3600)
 def about():
     """About page explaining the system"""
     return render_template('about.html')
@@ -988,22 +1035,22 @@ def save_test_data():
     """Save current results to a test data file for quick loading"""
     try:
         # Get the current processing status
-        if not processing_status.get("results"):
+        job = job_store.get(current_job_id())
+        if not job or not job.results:
             return jsonify({"success": False, "error": "No results to save"})
         
         # Create test data directory if it doesn't exist
         os.makedirs('test_data', exist_ok=True)
         
         # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        timestamp = time.strftime("%Y%m%d_%H%M%S")
         filename = f"test_data/travel_plan_{timestamp}.json"
         
         # Save the complete processing status
         test_data = {
-            "processing_status": processing_status,
-            "workflow_tracker": workflow_tracker,
+            "processing_status": job.to_dict(),
             "timestamp": timestamp,
-            "original_request": processing_status.get("original_request", {})
+            "original_request": job.original_request or {}
         }
         
         with open(filename, 'w') as f:
@@ -1019,7 +1066,7 @@ def save_test_data():
             "message": f"Test data saved to {filename}"
         })
     except Exception as e:
-        logger.error(f"Error saving test data: {str(e)}")
+        logger.error("Error saving test data: %s", e)
         return jsonify({"success": False, "error": str(e)})
 
 @app.route('/load_test_data/<filename>')
@@ -1040,15 +1087,15 @@ def load_test_data(filename):
         with open(filepath, 'r') as f:
             test_data = json.load(f)
         
-        # Restore the global state
-        global processing_status, workflow_tracker
-        processing_status.update(test_data.get("processing_status", {}))
-        workflow_tracker.update(test_data.get("workflow_tracker", {}))
+        # Restore the saved state as a new job for this session
+        job_id = uuid.uuid4().hex
+        job_store.create(job_id, **test_data.get("processing_status", {}))
+        session['job_id'] = job_id
         
         # Redirect to index (results page will be rebuilt) 
         return redirect(url_for('index'))
     except Exception as e:
-        logger.error(f"Error loading test data: {str(e)}")
+        logger.error("Error loading test data: %s", e)
         return f"Error loading test data: {str(e)}", 500
 
 @app.route('/test_data')
@@ -1071,7 +1118,7 @@ def test_data_list():
                 files.append({
                     "filename": filename,
                     "size": stat.st_size,
-                    "modified": datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M:%S")
+                    "modified": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(stat.st_mtime))
                 })
         
         # Sort by modified date, newest first
@@ -1079,7 +1126,7 @@ def test_data_list():
         
         return jsonify({"files": files})
     except Exception as e:
-        logger.error(f"Error listing test data: {str(e)}")
+        logger.error("Error listing test data: %s", e)
         return jsonify({"error": str(e)}), 500
 
 # Performance monitoring endpoints
@@ -1105,10 +1152,12 @@ def clear_cache():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.errorhandler(404)
+@cached_page(timeout=3600)
 def not_found_error(error):
     return render_template('404.html'), 404
 
 @app.errorhandler(500)
+@cached_page(timeout=3600, no_store=True)
 def internal_error(error):
     return render_template('500.html'), 500
 
@@ -1125,4 +1174,5 @@ if __name__ == '__main__':
     print("🌍 Starting GlobePiloT Flask Web Application...")
     print("🚀 Navigate to http://localhost:8000 to begin travel planning!")
     
-    app.run(debug=True, host='0.0.0.0', port=8000) 
\ No newline at end of file
+    # Debug mode (reloader, debugger, no template caching) only when asked for
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True, host='0.0.0.0', port=8000) 
\ No newline at end of file
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+GlobePiloT Budget Validation
+Classifies routes by the places they name and checks budgets against route minimums
+"""
+
+import re
+import functools
+import unicodedata
+from types import MappingProxyType
+from typing import Tuple
+
+# Budget validation data - realistic minimums for different route types
+# (read-only: estimates derived from it are memoized)
+ROUTE_BUDGET_MINIMUMS = MappingProxyType({
+    'domestic_short': 300,      # Same state/region
+    'domestic_medium': 500,     # Cross-country domestic
+    'domestic_long': 700,       # Coast-to-coast
+    'international_nearby': 800, # Canada/Mexico
+    'international_medium': 1200, # Europe/Asia
+    'international_long': 1500,  # Far destinations
+})
+
+# Locations used to classify a route for the budget minimums above
+MAJOR_US_CITIES = frozenset(['new york', 'los angeles', 'chicago', 'houston', 'phoenix',
+                             'philadelphia', 'san antonio', 'san diego', 'dallas', 'san jose',
+                             'austin', 'jacksonville', 'san francisco', 'columbus', 'charlotte',
+                             'fort worth', 'indianapolis', 'seattle', 'denver', 'washington dc',
+                             'boston', 'el paso', 'detroit', 'nashville', 'portland', 'memphis',
+                             'oklahoma city', 'las vegas', 'louisville', 'baltimore', 'milwaukee',
+                             'albuquerque', 'tucson', 'fresno', 'sacramento', 'mesa', 'kansas city',
+                             'atlanta', 'long beach', 'colorado springs', 'raleigh', 'omaha',
+                             'miami', 'oakland', 'minneapolis', 'tulsa', 'cleveland', 'wichita',
+                             'arlington', 'new orleans', 'bakersfield', 'tampa', 'honolulu',
+                             'aurora', 'anaheim', 'santa ana', 'st. louis', 'riverside', 'corpus christi',
+                             'lexington', 'pittsburgh', 'anchorage', 'stockton', 'cincinnati',
+                             'saint paul', 'toledo', 'newark', 'greensboro', 'plano', 'henderson',
+                             'lincoln', 'buffalo', 'jersey city', 'chula vista', 'fort wayne',
+                             'orlando', 'st. petersburg', 'chandler', 'laredo', 'norfolk', 'durham',
+                             'madison', 'lubbock', 'irvine', 'winston-salem', 'glendale', 'garland',
+                             'hialeah', 'reno', 'chesapeake', 'gilbert', 'baton rouge', 'irving',
+                             'scottsdale', 'north las vegas', 'fremont', 'boise', 'richmond'])
+
+US_STATES = frozenset(['california', 'texas', 'florida', 'new york', 'pennsylvania',
+                       'illinois', 'ohio', 'georgia', 'north carolina', 'michigan'])
+
+WEST_COAST_LOCATIONS = frozenset(['california', 'san diego', 'los angeles', 'san francisco', 'seattle', 'portland'])
+EAST_COAST_LOCATIONS = frozenset(['new york', 'boston', 'washington dc', 'philadelphia', 'miami', 'atlanta'])
+NEARBY_COUNTRIES = frozenset(['canada', 'mexico', 'canadian', 'mexican'])
+
+# Location group bits returned by location_groups()
+LOCATION_US = 1
+LOCATION_WEST_COAST = 2
+LOCATION_EAST_COAST = 4
+LOCATION_NEARBY_COUNTRY = 8
+
+_LOCATION_GROUPS = (
+    (LOCATION_US, MAJOR_US_CITIES | US_STATES),
+    (LOCATION_WEST_COAST, WEST_COAST_LOCATIONS),
+    (LOCATION_EAST_COAST, EAST_COAST_LOCATIONS),
+    (LOCATION_NEARBY_COUNTRY, NEARBY_COUNTRIES),
+)
+
+def _build_location_matcher():
+    """Compile every location name into one pattern and map each name to its group bits"""
+    bits = {}
+    for bit, names in _LOCATION_GROUPS:
+        for name in names:
+            bits[name] = bits.get(name, 0) | bit
+    
+    # Longest names are tried first, so a match hides shorter whole-word names
+    # starting at the same position; fold those names' bits into the longer one
+    name_bits = {}
+    for name in bits:
+        name_bits[name] = 0
+        for other, other_bits in bits.items():
+            if name.startswith(other) and not name[len(other):len(other) + 1].isalnum():
+                name_bits[name] |= other_bits
+    
+    # Whole words only, so "lorenzo" isn't Reno and "sandusky" isn't a US city;
+    # lookahead so overlapping names (e.g. "las vegas" in "north las vegas") all match
+    alternation = '|'.join(map(re.escape, sorted(name_bits, key=len, reverse=True)))
+    return re.compile(rf'\b(?=({alternation})\b)'), name_bits
+
+_LOCATION_RE, _LOCATION_BITS = _build_location_matcher()
+
+def location_groups(text: str) -> int:
+    """Bitmask of the location groups named (as whole words) in a casefolded place name"""
+    groups = 0
+    for match in _LOCATION_RE.finditer(text):
+        groups |= _LOCATION_BITS[match.group(1)]
+    return groups
+
+def _route_type(origin_groups: int, dest_groups: int) -> str:
+    """ROUTE_BUDGET_MINIMUMS key for a pair of location group bitmasks"""
+    # Check if both are US cities
+    if origin_groups & dest_groups & LOCATION_US:
+        # Domestic travel - check distance
+        is_coast_to_coast = (
+            (origin_groups & LOCATION_WEST_COAST and dest_groups & LOCATION_EAST_COAST) or
+            (dest_groups & LOCATION_WEST_COAST and origin_groups & LOCATION_EAST_COAST)
+        )
+        
+        if is_coast_to_coast:
+            return 'domestic_long'
+        else:
+            return 'domestic_medium'
+    else:
+        # International travel
+        if (origin_groups | dest_groups) & LOCATION_NEARBY_COUNTRY:
+            return 'international_nearby'
+        else:
+            return 'international_medium'
+
+# Every (origin, destination) group bitmask pair, classified once at import
+_ALL_LOCATION_GROUPS = LOCATION_US | LOCATION_WEST_COAST | LOCATION_EAST_COAST | LOCATION_NEARBY_COUNTRY
+_ROUTE_TYPES = {
+    (origin_groups, dest_groups): _route_type(origin_groups, dest_groups)
+    for origin_groups in range(_ALL_LOCATION_GROUPS + 1)
+    for dest_groups in range(_ALL_LOCATION_GROUPS + 1)
+}
+
+def _build_ascii_fold():
+    """Translate table folding accented Latin letters to ASCII and dropping combining marks"""
+    table = dict.fromkeys(range(0x300, 0x370))  # combining diacritics
+    for code in range(0xC0, 0x250):  # Latin-1 Supplement through Latin Extended-B
+        char = chr(code)
+        base = unicodedata.normalize('NFKD', char).encode('ascii', 'ignore').decode()
+        if base and base != char:
+            table[code] = base
+    return table
+
+_ASCII_FOLD = _build_ascii_fold()
+
+def normalize_place(name: str) -> str:
+    """Canonical form of a place name for location matching ("  Méxíco " -> "mexico")"""
+    # casefold also folds forms like "ß" that lower() leaves alone
+    return name.strip().casefold().translate(_ASCII_FOLD)
+
+def estimate_minimum_budget(origin: str, destination: str) -> int:
+    """Estimate minimum realistic budget based on origin and destination"""
+    return ROUTE_BUDGET_MINIMUMS[classify_route(origin, destination)]
+
+def classify_route(origin: str, destination: str) -> str:
+    """ROUTE_BUDGET_MINIMUMS key for the route between two place names"""
+    # Normalize first so equivalent spellings share a cache entry
+    return _classify_route(normalize_place(origin), normalize_place(destination))
+
+@functools.lru_cache(maxsize=4096)
+def _classify_route(origin_folded: str, destination_folded: str) -> str:
+    """Cached route type for normalized place names"""
+    return _ROUTE_TYPES[location_groups(origin_folded), location_groups(destination_folded)]
+
+# Budgets may fall 30% below a route's minimum before they're flagged
+BUDGET_TOLERANCE = 0.7
+
+# (minimum, lowest acceptable max budget) per route type
+_ROUTE_BUDGET_LIMITS = {
+    route_type: (minimum, minimum * BUDGET_TOLERANCE)
+    for route_type, minimum in ROUTE_BUDGET_MINIMUMS.items()
+}
+
+# Highest route minimum; budgets at or above its threshold pass for any route
+_MAX_ROUTE_MINIMUM, _MAX_ROUTE_THRESHOLD = max(_ROUTE_BUDGET_LIMITS.values())
+
+def validate_budget_realistic(origin: str, destination: str,
+                              min_budget: float, max_budget: float) -> Tuple[bool, int]:
+    """Validate if the budget is realistic for the given route (only max_budget matters)"""
+    # Generous budgets need no route classification
+    if max_budget >= _MAX_ROUTE_THRESHOLD:
+        return True, _MAX_ROUTE_MINIMUM
+    
+    # Memoized per normalized route, so repeat routes skip the location scan
+    minimum_needed, threshold = _ROUTE_BUDGET_LIMITS[classify_route(origin, destination)]
+    return max_budget >= threshold, minimum_needed
@@ -28,7 +28,7 @@ class CacheManager:
         (self.cache_dir / 'api_responses').mkdir(exist_ok=True)
         (self.cache_dir / 'templates').mkdir(exist_ok=True)
         
-        logger.info(f"Cache manager initialized with directory: {self.cache_dir}")
+        logger.info("Cache manager initialized with directory: %s", self.cache_dir)
     
     def generate_cache_key(self, data):
         """Generate a unique cache key from data"""
@@ -60,11 +60,11 @@ class CacheManager:
             with open(cache_path, 'wb') as f:
                 pickle.dump(cache_data, f)
             
-            logger.debug(f"Cached {cache_type}/{key} with TTL {ttl}s")
+            logger.debug("Cached %s/%s with TTL %ss", cache_type, key, ttl)
             return True
             
         except Exception as e:
-            logger.error(f"Failed to cache {cache_type}/{key}: {e}")
+            logger.error("Failed to cache %s/%s: %s", cache_type, key, e)
             return False
     
     def get(self, cache_type, key):
@@ -81,14 +81,14 @@ class CacheManager:
             # Check if cache has expired
             if time.time() > cache_data['expires']:
                 self.delete(cache_type, key)
-                logger.debug(f"Cache {cache_type}/{key} expired")
+                logger.debug("Cache %s/%s expired", cache_type, key)
                 return None
             
-            logger.debug(f"Cache hit for {cache_type}/{key}")
+            logger.debug("Cache hit for %s/%s", cache_type, key)
             return cache_data['data']
             
         except Exception as e:
-            logger.error(f"Failed to retrieve cache {cache_type}/{key}: {e}")
+            logger.error("Failed to retrieve cache %s/%s: %s", cache_type, key, e)
             return None
     
     def delete(self, cache_type, key):
@@ -97,21 +97,29 @@ class CacheManager:
             cache_path = self.get_cache_path(cache_type, key)
             if cache_path.exists():
                 cache_path.unlink()
-                logger.debug(f"Deleted cache {cache_type}/{key}")
+                logger.debug("Deleted cache %s/%s", cache_type, key)
             return True
         except Exception as e:
-            logger.error(f"Failed to delete cache {cache_type}/{key}: {e}")
+            logger.error("Failed to delete cache %s/%s: %s", cache_type, key, e)
             return False
     
+    def travel_results_key(self, request_params):
+        """Cache key for a travel request, ignoring case and spacing differences in its fields"""
+        normalized = {
+            field: ' '.join(value.split()).casefold() if isinstance(value, str) else value
+            for field, value in request_params.items()
+        }
+        return self.generate_cache_key(normalized)
+    
     def cache_travel_results(self, request_params, results):
         """Cache travel planning results"""
-        key = self.generate_cache_key(request_params)
+        key = self.travel_results_key(request_params)
         # Cache for 1 hour by default
         return self.set('results', key, results, ttl=3600)
     
     def get_cached_travel_results(self, request_params):
         """Get cached travel planning results"""
-        key = self.generate_cache_key(request_params)
+        key = self.travel_results_key(request_params)
         return self.get('results', key)
     
     def cache_api_response(self, endpoint, params, response):
@@ -144,12 +152,12 @@ class CacheManager:
                         cleaned += 1
                         
                 except Exception as e:
-                    logger.warning(f"Error checking cache file {cache_file}: {e}")
+                    logger.warning("Error checking cache file %s: %s", cache_file, e)
                     # Remove corrupted cache files
                     cache_file.unlink()
                     cleaned += 1
         
-        logger.info(f"Cleaned up {cleaned} expired cache entries")
+        logger.info("Cleaned up %s expired cache entries", cleaned)
         return cleaned
     
     def get_cache_stats(self):
@@ -190,7 +198,7 @@ class CacheManager:
             logger.info("Cleared all cache entries")
             return True
         except Exception as e:
-            logger.error(f"Failed to clear cache: {e}")
+            logger.error("Failed to clear cache: %s", e)
             return False
 
 # Global cache manager instance
@@ -27,17 +27,21 @@ import os
 import asyncio
 import time
 import re
+import httpx
 from datetime import datetime, timedelta
 from tavily import AsyncTavilyClient
 from dataclasses import dataclass
-from typing import Optional
+from typing import Callable, Optional
 
-# Load environment variables from .env file if it exists
-try:
-    from dotenv import load_dotenv
-    load_dotenv()
-except ImportError:
-    pass  # dotenv not installed, continue without it
+# Load environment variables from .env file if it exists; skipped when the keys are
+# already set (e.g. app.py loaded .env first) or GLOBEPILOT_SKIP_DOTENV=1
+if (os.environ.get('GLOBEPILOT_SKIP_DOTENV') != '1'
+        and not (os.getenv('OPENAI_API_KEY') and os.getenv('TAVILY_API_KEY'))):
+    try:
+        from dotenv import load_dotenv
+        load_dotenv()
+    except ImportError:
+        pass  # dotenv not installed, continue without it
 
 # LlamaIndex imports
 import llama_index.core
@@ -61,20 +65,38 @@ if not OPENAI_API_KEY:
 if not TAVILY_API_KEY:
     TAVILY_API_KEY = input("Enter your Tavily API key: ")
 
+# Shared keep-alive connection pool for every LLM call, so each request
+# reuses warm TCP/TLS connections instead of paying a fresh handshake
+http_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    timeout=httpx.Timeout(60.0, connect=10.0)
+)
+
+# Single Tavily client reused by every web search
+tavily_client = AsyncTavilyClient(api_key=TAVILY_API_KEY)
+
+async def close_http_clients():
+    """Close the shared connection pool (call from the loop that used it)"""
+    await http_client.aclose()
+
 # Initialize LLMs optimized for different cognitive requirements
 # Based on OpenAI model research and each agent's specific needs
 
 # GPT-4o: Best for creative tasks, multimodal processing, general research
-llm_creative = OpenAI(temperature=0.3, model="gpt-4o", api_key=OPENAI_API_KEY, top_p=0.9)
+llm_creative = OpenAI(temperature=0.3, model="gpt-4o", api_key=OPENAI_API_KEY, top_p=0.9,
+                      async_http_client=http_client)
 
 # GPT-4.1: Best for complex reasoning, large context, instruction following, coding
-llm_reasoning = OpenAI(temperature=0.2, model="gpt-4.1", api_key=OPENAI_API_KEY, top_p=0.85)
+llm_reasoning = OpenAI(temperature=0.2, model="gpt-4.1", api_key=OPENAI_API_KEY, top_p=0.85,
+                       async_http_client=http_client)
 
 # o3: Best for deep analytical reasoning, validation, quality control
-llm_analytical = OpenAI(temperature=0.1, model="o3", api_key=OPENAI_API_KEY, top_p=0.8)
+llm_analytical = OpenAI(temperature=0.1, model="o3", api_key=OPENAI_API_KEY, top_p=0.8,
+                        async_http_client=http_client)
 
 # GPT-4-turbo: Best for fast, efficient processing
-llm_efficient = OpenAI(temperature=0.2, model="gpt-4-turbo", api_key=OPENAI_API_KEY, top_p=0.9)
+llm_efficient = OpenAI(temperature=0.2, model="gpt-4-turbo", api_key=OPENAI_API_KEY, top_p=0.9,
+                       async_http_client=http_client)
 
 # Default LLM for backward compatibility
 llm = llm_creative  # Default to creative model
@@ -90,8 +112,7 @@ print("=" * 60)
 async def search_web(query: str) -> str:
     """Uses the web to search for travel information."""
     try:
-        client = AsyncTavilyClient(api_key=TAVILY_API_KEY)
-        result = await client.search(query)
+        result = await tavily_client.search(query)
         return str(result)
     except Exception as e:
         print(f"🚨 Search error for query '{query}': {str(e)}")
@@ -1036,7 +1057,8 @@ class WorkflowTracker:
             "api_limit_reached": self.api_calls > self.limits.max_api_calls
         }
 
-async def execute_validated_travel_workflow(prompt, custom_limits: Optional[WorkflowLimits] = None):
+async def execute_validated_travel_workflow(prompt, custom_limits: Optional[WorkflowLimits] = None,
+                                            progress_callback: Optional[Callable[[str, dict], None]] = None):
     """Execute travel planning workflow with validation and revision capabilities"""
     try:
         # Initialize limits and tracking
@@ -1096,6 +1118,14 @@ async def execute_validated_travel_workflow(prompt, custom_limits: Optional[Work
                         if current_agent not in agent_activations:
                             agent_activations.append(current_agent)
                             print(f"🤖 {current_agent} is now active (event: {event_count}, API calls: {tracker.api_calls})")
+                            # Report the handoff straight to the caller's progress tracker
+                            if progress_callback:
+                                progress_callback("agent_change", {
+                                    "current_agent": current_agent,
+                                    "completed_agents": tuple(agent_activations[:-1]),
+                                    "api_calls": tracker.api_calls,
+                                    "event_count": event_count,
+                                })
                             
                     # Try to detect tool calls
                     if hasattr(event, 'tool_name') and hasattr(event, 'tool_output'):
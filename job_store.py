@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+GlobePiloT Job Store
+Keeps planning status per job so concurrent users don't overwrite each other
+"""
+
+import os
+import time
+import threading
+import logging
+from dataclasses import dataclass, replace
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs are forgotten after this many seconds without updates
+JOB_TTL_SECONDS = int(os.environ.get('JOB_TTL_SECONDS', 3600))
+
+@dataclass(frozen=True, slots=True)
+class JobStatus:
+    """Immutable status of one planning job; updates store a new instance"""
+    is_processing: bool = False
+    progress: str = ""
+    results: Optional[dict] = None
+    original_request: Optional[dict] = None
+    # Agent progress reported by this job's workflow
+    current_agent: Optional[str] = None
+    completed_agents: tuple = ()
+    total_events: int = 0
+    # time.monotonic() readings and recent agent durations (seconds) for the ETA
+    started_at: Optional[float] = None
+    agent_started_at: Optional[float] = None
+    agent_durations: tuple = ()
+
+    def to_dict(self):
+        """Plain dict view for JSON responses and test data files"""
+        return {
+            "is_processing": self.is_processing,
+            "progress": self.progress,
+            "results": self.results,
+            "original_request": self.original_request,
+            "current_agent": self.current_agent,
+            "completed_agents": self.completed_agents,
+            "total_events": self.total_events
+        }
+
+# (status, version) returned for unknown jobs
+_MISSING = (None, None)
+
+class JobStore:
+    """Thread-safe in-process store for travel planning jobs keyed by job id
+
+    Each job is held as one (JobStatus, version) tuple that writers replace
+    under the lock; readers just fetch the tuple, so polls never block.
+    """
+
+    def __init__(self, ttl_seconds=JOB_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._entries = {}
+        self._touched = {}
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+
+    def create(self, job_id, **fields):
+        """Register a new job with default status fields"""
+        job = JobStatus(**fields)
+
+        with self._changed:
+            self._evict_expired()
+            self._entries[job_id] = (job, 1)
+            self._touched[job_id] = time.monotonic()
+            self._changed.notify_all()
+
+        logger.debug("Created job %s", job_id)
+        return job_id
+
+    def get(self, job_id):
+        """Return the job's current JobStatus, or None if unknown"""
+        return self._entries.get(job_id, _MISSING)[0]
+
+    def get_versioned(self, job_id):
+        """Return (status, version) read together, or (None, None) if unknown"""
+        return self._entries.get(job_id, _MISSING)
+
+    def update(self, job_id, **fields):
+        """Update fields of an existing job (sweeping expired jobs like every write)"""
+        with self._changed:
+            self._evict_expired()
+            entry = self._entries.get(job_id)
+            if entry is None:
+                return False
+            job, version = entry
+            self._entries[job_id] = (replace(job, **fields), version + 1)
+            self._touched[job_id] = time.monotonic()
+            self._changed.notify_all()
+            return True
+
+    def delete(self, job_id):
+        """Forget a job"""
+        with self._changed:
+            self._touched.pop(job_id, None)
+            removed = self._entries.pop(job_id, None) is not None
+            self._changed.notify_all()
+            return removed
+
+    def wait_for_change(self, job_id, since_version=None, timeout=None):
+        """Block until the job differs from since_version (or timeout); return (status, version)"""
+        with self._changed:
+            self._changed.wait_for(lambda: self._entries.get(job_id, _MISSING)[1] != since_version, timeout)
+            return self._entries.get(job_id, _MISSING)
+
+    def _evict_expired(self):
+        """Drop finished jobs idle for longer than the TTL (caller holds the lock)"""
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [
+            job_id for job_id, touched in self._touched.items()
+            if touched < cutoff and not self._entries[job_id][0].is_processing
+        ]
+        for job_id in expired:
+            del self._entries[job_id], self._touched[job_id]
+
+        if expired:
+            logger.debug("Evicted %s expired jobs", len(expired))
+
+# Global job store instance
+job_store = JobStore()
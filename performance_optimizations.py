@@ -4,16 +4,52 @@ GlobePiloT Performance Optimization Module
 Provides middleware and utilities for improved Flask application performance
 """
 
+import os
 import time
 import gzip
-import io
-from flask import Flask, request, current_app, g
+from flask import Flask, request, current_app, g, session
+from flask.json.provider import DefaultJSONProvider
+from jinja2 import FileSystemBytecodeCache
 from functools import wraps
 import logging
 from cache_manager import cache_manager
 
+# orjson is optional - fall back to Flask's stdlib-based JSON when missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson's C implementation"""
+    
+    def _dumps_bytes(self, obj, **kwargs):
+        option = orjson.OPT_NON_STR_KEYS
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=self.default, option=option)
+    
+    def dumps(self, obj, **kwargs):
+        return self._dumps_bytes(obj, **kwargs).decode()
+    
+    def loads(self, s, **kwargs):
+        # orjson has no object_hook, which the session serializer relies on
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        """Build jsonify() responses straight from orjson's bytes, skipping the str round trip"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(
+            self._dumps_bytes(obj, indent=indent) + b"\n", mimetype=self.mimetype
+        )
+
 class PerformanceMiddleware:
     """Middleware for performance optimizations"""
     
@@ -26,7 +62,6 @@ class PerformanceMiddleware:
         """Initialize the middleware with Flask app"""
         app.before_request(self.before_request)
         app.after_request(self.after_request)
-        app.teardown_appcontext(self.cleanup)
         
         # Add custom headers for performance
         @app.after_request
@@ -68,7 +103,7 @@ class PerformanceMiddleware:
             cached_response = cache_manager.get('api_responses', cache_key)
             
             if cached_response:
-                logger.debug(f"Serving cached response for {request.path}")
+                logger.debug("Serving cached response for %s", request.path)
                 return cached_response
     
     def after_request(self, response):
@@ -94,13 +129,9 @@ class PerformanceMiddleware:
                 cache_manager.set('api_responses', cache_key, response_data, ttl=300)
             except UnicodeDecodeError:
                 # Skip caching if we can't decode the response as text
-                logger.debug(f"Skipping cache for {cache_key} - binary response")
+                logger.debug("Skipping cache for %s - binary response", cache_key)
         
         return response
-    
-    def cleanup(self, error):
-        """Cleanup after request"""
-        pass
 
 def gzip_middleware(app):
     """Add gzip compression middleware"""
@@ -119,27 +150,30 @@ def gzip_middleware(app):
         if response.headers.get('Content-Encoding'):
             return response
         
+        # Streamed responses (e.g. Server-Sent Events) must not be buffered
+        if response.is_streamed:
+            return response
+        
         try:
             # Try to get response data - will fail for direct passthrough responses
             response_data = response.get_data()
             
             # Skip if response is too small
-            if len(response_data) < 500:
+            if len(response_data) < MIN_GZIP_SIZE:
                 return response
             
-            # Compress the response
-            gzip_buffer = io.BytesIO()
-            with gzip.GzipFile(fileobj=gzip_buffer, mode='wb') as gzip_file:
-                gzip_file.write(response_data)
+            # Compress the response in one call; level 6 trades little size for much less CPU than 9
+            compressed = gzip.compress(response_data, compresslevel=6)
             
-            response.set_data(gzip_buffer.getvalue())
+            response.set_data(compressed)
             response.headers['Content-Encoding'] = 'gzip'
-            response.headers['Content-Length'] = len(response.get_data())
+            response.headers['Content-Length'] = len(compressed)
+            response.vary.add('Accept-Encoding')
             
         except RuntimeError as e:
             # Handle direct passthrough responses (static files)
             if "direct passthrough mode" in str(e):
-                logger.debug(f"Skipping compression for direct passthrough response: {request.path}")
+                logger.debug("Skipping compression for direct passthrough response: %s", request.path)
                 return response
             else:
                 # Re-raise other RuntimeErrors
@@ -174,11 +208,11 @@ def async_task_decorator(timeout=300):
             thread.join(timeout)
             
             if not result_container['completed']:
-                logger.warning(f"Task {func.__name__} timed out after {timeout}s")
+                logger.warning("Task %s timed out after %ss", func.__name__, timeout)
                 return {'error': 'Task timed out', 'timeout': True}
             
             if result_container['error']:
-                logger.error(f"Task {func.__name__} failed: {result_container['error']}")
+                logger.error("Task %s failed: %s", func.__name__, result_container['error'])
                 return {'error': result_container['error']}
             
             return result_container['result']
@@ -210,6 +244,51 @@ def lazy_loading_decorator(template_name):
         return wrapper
     return decorator
 
+# Rendered bodies of static pages: {endpoint: (expires, body, gzipped body or None, status, mimetype)}
+_page_cache = {}
+
+# Bodies smaller than this aren't worth compressing (same cut-off as gzip_middleware)
+MIN_GZIP_SIZE = 500
+
+def cached_page(timeout=3600, no_store=False):
+    """Decorator serving a static page's rendered body from memory
+    
+    no_store keeps clients and proxies from storing the response (e.g. error pages).
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # Pending flash messages make the page user-specific
+            if session.get('_flashes'):
+                return func(*args, **kwargs)
+            
+            now = time.time()
+            entry = _page_cache.get(func.__name__)
+            if entry is None or entry[0] < now:
+                rendered = current_app.make_response(func(*args, **kwargs))
+                body = rendered.get_data()
+                # Compressed once here rather than by gzip_middleware on every hit
+                gzipped = gzip.compress(body, compresslevel=9) if len(body) >= MIN_GZIP_SIZE else None
+                entry = (now + timeout, body, gzipped, rendered.status_code, rendered.mimetype)
+                _page_cache[func.__name__] = entry
+            
+            _, body, gzipped, status, mimetype = entry
+            if gzipped is not None and 'gzip' in request.headers.get('Accept-Encoding', '').lower():
+                response = current_app.response_class(gzipped, status=status, mimetype=mimetype)
+                response.headers['Content-Encoding'] = 'gzip'
+            else:
+                response = current_app.response_class(body, status=status, mimetype=mimetype)
+            # Both encodings share the URL, so shared caches must key on Accept-Encoding
+            response.vary.add('Accept-Encoding')
+            
+            if no_store:
+                response.cache_control.no_store = True
+            
+            return response
+        
+        return wrapper
+    return decorator
+
 def optimize_db_queries():
     """Optimization utilities for database queries"""
     # This would be expanded when adding a database
@@ -220,13 +299,13 @@ def setup_performance_monitoring(app):
     
     @app.before_request
     def log_request_info():
-        logger.info(f"Request: {request.method} {request.path} from {request.remote_addr}")
+        logger.info("Request: %s %s from %s", request.method, request.path, request.remote_addr)
     
     @app.after_request
     def log_response_info(response):
         if hasattr(g, 'start_time'):
             duration = time.time() - g.start_time
-            logger.info(f"Response: {response.status_code} in {duration:.3f}s")
+            logger.info("Response: %s in %.3fs", response.status_code, duration)
         return response
     
     # Periodic cache cleanup
@@ -238,9 +317,9 @@ def setup_performance_monitoring(app):
             time.sleep(3600)  # Run every hour
             try:
                 cleaned = cache_manager.cleanup_expired()
-                logger.info(f"Periodic cleanup: removed {cleaned} expired cache entries")
+                logger.info("Periodic cleanup: removed %s expired cache entries", cleaned)
             except Exception as e:
-                logger.error(f"Cache cleanup error: {e}")
+                logger.error("Cache cleanup error: %s", e)
     
     cleanup_thread = threading.Thread(target=periodic_cleanup)
     cleanup_thread.daemon = True
@@ -308,9 +387,22 @@ def configure_static_file_serving(app):
             conditional=True
         )
 
+def configure_template_caching(app):
+    """Stop per-render template stat checks and reuse compiled template bytecode"""
+    # Debug mode (app.debug / TEMPLATES_AUTO_RELOAD) still turns reloading back on
+    app.jinja_env.auto_reload = False
+    
+    # Jinja's default directory is private to the current user (0o700, owner checked), so
+    # other local users can't plant bytecode in it
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
 def initialize_performance_optimizations(app):
     """Initialize all performance optimizations"""
     
+    # Faster JSON serialization for status/API responses
+    if orjson is not None:
+        app.json = ORJSONProvider(app)
+    
     # Setup gzip compression first (runs last in after_request chain)
     gzip_middleware(app)
     
@@ -320,6 +412,9 @@ def initialize_performance_optimizations(app):
     # Configure static file serving
     configure_static_file_serving(app)
     
+    # Configure template caching
+    configure_template_caching(app)
+    
     # Setup monitoring
     setup_performance_monitoring(app)
     
@@ -59,7 +59,7 @@ def main():
     # Import and run the Flask app
     try:
         from app import app
-        app.run(debug=True, host='0.0.0.0', port=8000)
+        app.run(debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True, host='0.0.0.0', port=8000)
     except KeyboardInterrupt:
         print("\n👋 GlobePiloT server stopped")
     except Exception as e: